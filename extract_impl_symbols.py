@@ -7,22 +7,379 @@ symbol string.
 """
 
 import argparse
+import concurrent.futures
+import functools
+import hashlib
 import json
+import mmap
 import os
+import pickle
+import re
 import sys
+from array import array
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def extract_impl_symbols(json_file, patterns=None, functions_only=True):
+if orjson is not None:
+    _loads = orjson.loads
+    JSON_DECODE_ERRORS = (orjson.JSONDecodeError, json.JSONDecodeError)
+else:
+    _loads = json.loads
+    JSON_DECODE_ERRORS = (json.JSONDecodeError,)
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+else:
+    JSON_DECODE_ERRORS += (ijson.JSONError,)
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Bump when the cached results change shape or meaning
+CACHE_VERSION = 2
+
+# Newlines between matches are counted this many bytes at a time, so a long
+# gap is never copied out of the mmap whole
+COUNT_WINDOW = 1 << 20
+
+# Matches a `"symbol": "<value>"` pair and captures the raw (still escaped)
+# string value
+SYMBOL_RE = re.compile(rb'"symbol"\s*:\s*"([^"\\]*(?:\\.[^"\\]*)*)"')
+
+# Matches either a `"symbol": "<value>"` pair or the opening of one of the
+# arrays that tell symbol definitions apart from symbol occurrences in an
+# indented SCIP index. Running it over the whole mmap keeps the byte scanning
+# in re's C search loop, which beats a NumPy sweep comparing shifted uint8
+# views on real indices (and does not need NumPy).
+SCAN_RE = re.compile(
+    rb'"(?:symbol"\s*:\s*"([^"\\]*(?:\\.[^"\\]*)*)"'
+    rb'|(documents|external_symbols|occurrences|symbols)"\s*:\s*\[)'
+)
+
+
+def _decode_symbol(value):
+    """Turn a raw JSON string value (without its quotes) into the symbol.
+    
+    Only values containing an escape go through the JSON decoder, the rest is
+    plain UTF-8.
+    """
+    if b'\\' in value:
+        return json.loads(b'"' + value + b'"')
+    return value.decode('utf-8')
+
+
+def _count_newlines(mm, start, end):
+    """Count the newlines in mm[start:end] without copying more than a window."""
+    count = 0
+    for pos in range(start, end, COUNT_WINDOW):
+        count += mm[pos:min(pos + COUNT_WINDOW, end)].count(b'\n')
+    return count
+
+
+def _is_root_prefix(prefix):
+    """Check that `prefix` opens the root object and holds only complete members.
+    
+    The key following such a prefix is a direct child of the root object.
+    """
+    head = prefix.rstrip()
+    if head.endswith(b','):
+        head = head[:-1]
+    try:
+        return isinstance(_loads(head + b'}'), dict)
+    except ValueError:
+        return False
+
+
+def _new_line_array():
+    """Line numbers are stored unboxed, as int64, to keep large indices cheap."""
+    return array('q')
+
+
+def _pattern_matcher(patterns):
+    """Build a function checking if a lowercased symbol contains any pattern.
+    
+    With pyahocorasick installed the patterns are compiled into a single
+    Aho-Corasick automaton, so each symbol is scanned once however many
+    patterns are given.
+    """
+    if ahocorasick is None or not patterns or '' in patterns:
+        return lambda sl: any(p in sl for p in patterns)
+    
+    automaton = ahocorasick.Automaton()
+    for p in patterns:
+        automaton.add_word(p, p)
+    automaton.make_automaton()
+    return lambda sl: next(automaton.iter(sl), None) is not None
+
+
+def _make_symbol_filter(patterns, functions_only):
+    """Build the predicate deciding whether a symbol should be reported.
+    
+    Everything that does not depend on the symbol itself is set up once
+    here, and the cheap checks run first so most symbols are rejected
+    without ever being lowercased. Patterns match case-insensitively; the
+    lowercased copy of the symbol is only made when the patterns have
+    letters at all.
+    
+    Args:
+        patterns: List of patterns to search for
+        functions_only: If True, only match function symbols ending in '().'
+    
+    Returns:
+        function taking a symbol string and returning a bool
+    """
+    patterns = tuple(p.lower() for p in patterns)
+    contains_pattern = _pattern_matcher(patterns)
+    # Without any cased character in the patterns, the case of the symbol
+    # cannot matter and the lowercased copy can be skipped
+    fold_case = any(p != p.upper() for p in patterns)
+    
+    def is_impl_symbol(s):
+        # Impl symbols always have a type descriptor
+        if '#' not in s:
+            return False
+        # Optionally filter to just function symbols (ending in parentheses)
+        if functions_only and not s.endswith('().'):
+            return False
+        # Skip local variables, test functions, and core library
+        if s.startswith('local ') or 'tests/' in s or '/core ' in s:
+            return False
+        # Look for impl symbols containing any of the patterns
+        return contains_pattern(s.lower() if fold_case else s)
+    
+    return is_impl_symbol
+
+
+def _scan_indented_json(mm, is_impl_symbol):
+    """Collect matching symbols and their line numbers in a single pass.
+    
+    This only works for indented JSON (what `scip print --json` produces),
+    where every key sits on its own line and the nesting depth can be read
+    off the indentation. A `"symbol"` key five levels deep inside a
+    document's `symbols` array is a symbol definition, every other
+    `"symbol"` key is an occurrence (or relationship) of that symbol.
+    
+    Apart from the part before the `documents` key, the file is not
+    validated, so broken JSON with the expected layout is not reported.
+    
+    Args:
+        mm: Memory-mapped SCIP JSON file
+        is_impl_symbol: Symbol filter from `_make_symbol_filter`
+    
+    Returns:
+        dict mapping symbols (as UTF-8 bytes) to line numbers, or None if the file
+        does not have the expected layout or defines no matching symbol
+    """
+    # Indented JSON has one key per line, anything on one or two lines is
+    # compact and left to the fallback
+    first_newline = mm.find(b'\n', 0)
+    if first_newline == -1 or mm.find(b'\n', first_newline + 1) == -1:
+        return None
+    
+    unit = None  # Indentation width of one nesting level
+    in_documents = False
+    in_symbols = False
+    defined = set()
+    candidate_lines = defaultdict(_new_line_array)
+    # SCIP indices repeat the same symbol strings over and over, so the
+    # filter only runs once per distinct raw value. Kept values map to the
+    # UTF-8 encoding of the unescaped symbol, rejected ones to False.
+    verdicts = {}
+    # Line numbers are counted lazily, only up to the matches we keep
+    line_num = 1
+    counted = 0
+    # Start of the line holding the current match. It is only ever searched
+    # for forward from the last position looked at, so that a long line is
+    # not searched again for every match it contains.
+    line_start = 0
+    seen = 0
+    try:
+        for m in SCAN_RE.finditer(mm):
+            value, key = m.groups()
+            start = m.start()
+            if value is not None:
+                symbol = verdicts.get(value)
+                if symbol is None:
+                    s = _decode_symbol(value)
+                    symbol = verdicts[value] = is_impl_symbol(s) and s.encode('utf-8')
+                if not symbol:
+                    continue
+                line_num += _count_newlines(mm, counted, start)
+                counted = start
+                candidate_lines[symbol].append(line_num)
+                if in_symbols:
+                    line_start = mm.rfind(b'\n', seen, start) + 1 or line_start
+                    seen = start
+                    if start - line_start == 5 * unit:
+                        defined.add(symbol)
+                continue
+            
+            line_start = mm.rfind(b'\n', seen, start) + 1 or line_start
+            seen = start
+            indent = start - line_start
+            if unit is None:
+                if key != b'documents':
+                    continue
+                # The first "documents" key decides whether the layout is
+                # understood at all, and it has to belong to the root object
+                if not indent or mm[line_start:start].strip():
+                    return None
+                if not _is_root_prefix(mm[:line_start]):
+                    return None
+                unit = indent
+                in_documents = True
+                continue
+            
+            # Array keys only count at the start of a line, and only the two
+            # depths below matter, so at most 3 * unit bytes get checked
+            if indent == unit and key == b'external_symbols':
+                if not mm[line_start:start].strip():
+                    in_documents = in_symbols = False
+            elif indent == 3 * unit and in_documents:
+                if not mm[line_start:start].strip():
+                    in_symbols = key == b'symbols'
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        # Let the fallback parser report the problem
+        return None
+    
+    # A truncated file would otherwise yield partial results
+    if unit is None or not mm[-64:].rstrip().endswith(b'}'):
+        return None
+    
+    # Without a single match the two-pass path has the final word, which
+    # also reports files that are not SCIP indices or not valid JSON
+    if not defined:
+        return None
+    
+    return {
+        symbol: lines
+        for symbol, lines in candidate_lines.items()
+        if symbol in defined
+    }
+
+
+def _load_symbols(mm):
+    """Collect the symbols defined in the documents of a SCIP JSON file.
+    
+    With ijson installed the file is streamed and only the symbol strings are
+    kept in memory, otherwise the whole document is parsed.
+    
+    Args:
+        mm: Memory-mapped SCIP JSON file
+    
+    Returns:
+        tuple: (set of symbol strings, error_message or None)
+    """
+    if ijson is None:
+        data = _loads(mm[:])
+        
+        # Validate expected structure
+        if not isinstance(data, dict):
+            return None, f"Expected JSON object, got {type(data).__name__}"
+        
+        if 'documents' not in data:
+            return None, "Missing 'documents' key in JSON (not a SCIP file?)"
+        
+        if not isinstance(data['documents'], list):
+            return None, "Expected 'documents' to be a list"
+        
+        return {
+            sym.get('symbol', '')
+            for doc in data['documents']
+            for sym in doc.get('symbols', ())
+        }, None
+    
+    # Validate the structure from the first events: the top-level type, and
+    # the type of the value following the 'documents' key (which comes right
+    # after the small metadata object in SCIP output)
+    mm.seek(0)
+    events = ijson.parse(mm, use_float=True)
+    _, event, value = next(events)
+    if event != 'start_map':
+        kind = 'list' if event == 'start_array' else type(value).__name__
+        return None, f"Expected JSON object, got {kind}"
+    
+    for prefix, event, value in events:
+        if prefix == '' and event == 'map_key' and value == 'documents':
+            if next(events)[1] != 'start_array':
+                return None, "Expected 'documents' to be a list"
+            break
+    else:
+        return None, "Missing 'documents' key in JSON (not a SCIP file?)"
+    
+    mm.seek(0)
+    symbols = ijson.items(mm, 'documents.item.symbols.item.symbol', use_float=True)
+    return set(symbols), None
+
+
+def _cache_path(json_file, patterns, functions_only):
+    """Path of the cache entry for a file in its current state.
+    
+    The key covers the file's location, size and modification time, so a
+    regenerated index gets a new entry, as well as the options that affect
+    the result.
+    """
+    st = os.stat(json_file)
+    key = '|'.join(str(part) for part in (
+        CACHE_VERSION,
+        os.path.realpath(json_file),
+        st.st_size,
+        st.st_mtime_ns,
+        list(patterns),
+        functions_only,
+    ))
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'extract_impl_symbols', f"{digest}.pkl")
+
+
+def _read_cache(path):
+    """Load cached symbol lines, or return None if there is no usable entry."""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _write_cache(path, symbol_lines):
+    """Store symbol lines in the cache, ignoring errors (caching is optional)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(symbol_lines, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Do not leave a partial entry behind (e.g. when the disk is full)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def extract_impl_symbols(json_file, patterns=None, functions_only=True, cache=False):
     """Extract impl-related symbols from a SCIP JSON file with line numbers.
     
     Args:
         json_file: Path to the SCIP JSON file
         patterns: List of patterns to search for (default: ['neg', 'mul'])
         functions_only: If True, only match function symbols ending in '().'
+        cache: If True, reuse (and store) results under $XDG_CACHE_HOME
+            (default ~/.cache) for files that have not changed since the
+            previous run
     
     Returns:
-        tuple: (symbol_lines dict, error_message or None)
+        tuple: (symbol_lines dict, error_message or None). Symbols are the
+        unescaped symbol strings, encoded as UTF-8 bytes.
     """
     if patterns is None:
         patterns = ['neg', 'mul']
@@ -35,15 +392,37 @@ def extract_impl_symbols(json_file, patterns=None, functions_only=True):
     if os.path.getsize(json_file) == 0:
         return None, f"File is empty: {json_file}"
     
-    # Try to load JSON
+    cache_path = _cache_path(json_file, patterns, functions_only) if cache else None
+    if cache_path is not None:
+        symbol_lines = _read_cache(cache_path)
+        if symbol_lines is not None:
+            return symbol_lines, None
+    
+    is_impl_symbol = _make_symbol_filter(patterns, functions_only)
+    symbol_lines, error = _find_symbol_lines(json_file, is_impl_symbol)
+    
+    if cache_path is not None and error is None:
+        _write_cache(cache_path, symbol_lines)
+    
+    return symbol_lines, error
+
+
+def _find_symbol_lines(json_file, is_impl_symbol):
+    """Find the matching symbols of an existing, non-empty file.
+    
+    Returns:
+        tuple: (symbol_lines dict, error_message or None)
+    """
+    # Try to load JSON (orjson or ijson are used when installed, they are
+    # much faster than the stdlib decoder on large indices)
     try:
-        with open(json_file) as f:
+        with open(json_file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
             # Peek at first few bytes to detect non-JSON content
-            first_bytes = f.read(100)
-            f.seek(0)
+            first_bytes = mm[:100]
             
             # Check for ANSI escape codes (colored debug output)
-            if '\x1b[' in first_bytes or '[0m' in first_bytes:
+            if b'\x1b[' in first_bytes or b'[0m' in first_bytes:
                 return None, (
                     f"File contains ANSI escape codes (not valid JSON): {json_file}\n"
                     "  This looks like colored debug output, not JSON.\n"
@@ -51,55 +430,112 @@ def extract_impl_symbols(json_file, patterns=None, functions_only=True):
                 )
             
             # Check for Go-style struct output
-            if first_bytes.startswith('&scip.'):
+            if first_bytes.startswith(b'&scip.'):
                 return None, (
                     f"File contains Go struct format (not valid JSON): {json_file}\n"
                     "  This looks like 'scip print' output without --json flag.\n"
                     "  Try: scip print --json <file.scip> > output.json"
                 )
             
-            data = json.load(f)
+            # Indented JSON is handled in a single streaming pass
+            symbol_lines = _scan_indented_json(mm, is_impl_symbol)
+            if symbol_lines is not None:
+                return symbol_lines, None
+            
+            # Anything else (compact JSON, truncated files, ...) is parsed
+            # properly, which also gives an error for invalid JSON
+            raw_symbols, error = _load_symbols(mm)
+            if error:
+                return None, f"{error}: {json_file}"
+            
+            # Keep the matching symbols, filtering each distinct string once
+            matching_symbols = {s for s in raw_symbols if is_impl_symbol(s)}
+            if not matching_symbols:
+                # Nothing can match, no need to scan the file again
+                return {}, None
+            
+            # Compact JSON is a single line, so the position of every symbol
+            # is already known without scanning the file again (explicit start,
+            # as ijson has moved the mmap position to the end)
+            if mm.find(b'\n', 0) in (-1, len(mm) - 1):
+                return {
+                    s.encode('utf-8'): array('q', [1]) for s in matching_symbols
+                }, None
             
-    except json.JSONDecodeError as e:
-        return None, f"Invalid JSON in {json_file}: {e}"
+            return _scan_symbol_lines(mm, matching_symbols), None
+            
+    except JSON_DECODE_ERRORS as e:
+        # yajl (used by ijson) appends a multi-line excerpt, keep the summary
+        reason = str(e).partition('\n')[0]
+        return None, f"Invalid JSON in {json_file}: {reason}"
     except PermissionError:
         return None, f"Permission denied: {json_file}"
     except Exception as e:
         return None, f"Error reading {json_file}: {e}"
+
+
+def _scan_symbol_lines(mm, matching_symbols):
+    """Find the line numbers of every occurrence of the given symbols.
     
-    # Validate expected structure
-    if not isinstance(data, dict):
-        return None, f"Expected JSON object, got {type(data).__name__}: {json_file}"
-    
-    if 'documents' not in data:
-        return None, f"Missing 'documents' key in JSON (not a SCIP file?): {json_file}"
-    
-    # First pass: collect matching symbols
-    matching_symbols = set()
-    for doc in data.get('documents', []):
-        for sym in doc.get('symbols', []):
-            s = sym.get('symbol', '')
-            # Look for impl symbols containing any of the patterns
-            if any(p in s.lower() for p in patterns) and '#' in s:
-                # Skip local variables, test functions, and core library
-                if s.startswith('local ') or 'tests/' in s or '/core ' in s:
-                    continue
-                # Optionally filter to just function symbols (ending in parentheses)
-                if functions_only and not s.endswith('().'):
-                    continue
-                matching_symbols.add(s)
+    Each `"symbol"` value in the file costs a single set lookup, whatever the
+    number of matching symbols.
     
-    # Second pass: find line numbers for symbol occurrences
-    symbol_lines = defaultdict(list)
-    with open(json_file) as f:
-        for line_num, line in enumerate(f, 1):
-            if '"symbol":' not in line:
-                continue
-            for symbol in matching_symbols:
-                if f'"{symbol}"' in line:
-                    symbol_lines[symbol].append(line_num)
+    Args:
+        mm: Memory-mapped SCIP JSON file
+        matching_symbols: Set of symbol strings to look for
+    
+    Returns:
+        dict mapping symbols (as UTF-8 bytes) to line numbers
+    """
+    matching_bytes = {s.encode('utf-8') for s in matching_symbols}
+    symbol_lines = defaultdict(_new_line_array)
+    line_num = 1
+    counted = 0
+    for m in SYMBOL_RE.finditer(mm):
+        symbol = m.group(1)
+        if b'\\' in symbol:
+            symbol = _decode_symbol(symbol).encode('utf-8')
+        if symbol not in matching_bytes:
+            continue
+        line_num += _count_newlines(mm, counted, m.start())
+        counted = m.start()
+        lines = symbol_lines[symbol]
+        # Compact JSON puts the whole index on one line, record each
+        # symbol only once per line
+        if not lines or lines[-1] != line_num:
+            lines.append(line_num)
     
-    return symbol_lines, None
+    return symbol_lines
+
+
+def _format_result(json_file, symbol_lines, error, patterns):
+    """Format the report for one file as returned by extract_impl_symbols()."""
+    out = [f"\n=== {json_file} ==="]
+    
+    if error:
+        out.append(f"ERROR: {error}")
+        return '\n'.join(out)
+    
+    if not symbol_lines:
+        out.append(f"No matching symbols found (patterns: {', '.join(patterns)}).")
+        return '\n'.join(out)
+    
+    # Count how many impl blocks produce each symbol (UTF-8 bytes sort in
+    # the same order as the decoded strings)
+    for symbol in sorted(symbol_lines.keys()):
+        lines = symbol_lines[symbol]
+        s = symbol.decode('utf-8')
+        first_line = lines[0]
+        # For duplicates, show all lines where the same symbol is defined
+        if len(lines) > 2:  # More than expected (def + metadata)
+            # This means the same symbol string is used for multiple impls
+            out.append(f"L{first_line}: {s}  (DUPLICATE! also at L{', '.join(str(l) for l in lines[1:])})")
+        else:
+            out.append(f"L{first_line}: {s}")
+    
+    unique_symbols = len(symbol_lines)
+    out.append(f"\nUnique symbols: {unique_symbols}")
+    return '\n'.join(out)
 
 
 def main():
@@ -120,6 +556,9 @@ Examples:
   # Include non-function symbols (Output types, etc.)
   %(prog)s --all index.json
 
+  # Reuse results from previous runs while the file is unchanged
+  %(prog)s --cache index.json
+
 Converting SCIP to JSON:
   scip print --json index.scip > index.json
 
@@ -152,44 +591,39 @@ What this script detects:
         help='Include all matching symbols, not just functions (ending in "().")',
     )
     
+    parser.add_argument(
+        '--cache',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help='Cache results per file under $XDG_CACHE_HOME (default ~/.cache)/extract_impl_symbols and reuse them while the file is unchanged (default: off)',
+    )
+    
     args = parser.parse_args()
     
     patterns = args.patterns if args.patterns else ['neg', 'mul']
     functions_only = not args.all_symbols
     
+    extract = functools.partial(
+        extract_impl_symbols,
+        patterns=patterns,
+        functions_only=functions_only,
+        cache=args.cache,
+    )
+    
+    # Files are independent, analyze them in parallel when there are several
+    if len(args.files) == 1:
+        results = [extract(args.files[0])]
+    else:
+        max_workers = min(len(args.files), os.cpu_count() or 1)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(extract, args.files))
+    
     exit_code = 0
     
-    for json_file in args.files:
-        print(f"\n=== {json_file} ===")
-        
-        symbol_lines, error = extract_impl_symbols(
-            json_file,
-            patterns=patterns,
-            functions_only=functions_only,
-        )
-        
+    for json_file, (symbol_lines, error) in zip(args.files, results):
+        print(_format_result(json_file, symbol_lines, error, patterns))
         if error:
-            print(f"ERROR: {error}")
             exit_code = 1
-            continue
-        
-        if not symbol_lines:
-            print(f"No matching symbols found (patterns: {', '.join(patterns)}).")
-            continue
-        
-        # Count how many impl blocks produce each symbol
-        for s in sorted(symbol_lines.keys()):
-            lines = symbol_lines[s]
-            first_line = lines[0]
-            # For duplicates, show all lines where the same symbol is defined
-            if len(lines) > 2:  # More than expected (def + metadata)
-                # This means the same symbol string is used for multiple impls
-                print(f"L{first_line}: {s}  (DUPLICATE! also at L{', '.join(str(l) for l in lines[1:])})")
-            else:
-                print(f"L{first_line}: {s}")
-        
-        unique_symbols = len(symbol_lines)
-        print(f"\nUnique symbols: {unique_symbols}")
     
     sys.exit(exit_code)
 